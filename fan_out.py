@@ -0,0 +1,136 @@
+"""
+Modul: Fan-out-Auswertung mehrerer Strategien auf einem gemeinsamen Ankunftsstrom
+
+Statt für jede Strategie (z.B. Strategie 1 und Strategie 2 mit T = 5/10/20) einen eigenen
+Ankunftsprozess zu erzeugen, werden Zwischenankunfts- und Bedienzeiten pro Replikation nur einmal
+gezogen und allen Strategie-Instanzen über dieselbe Schnittstelle wie Trace-Quellen zugeführt.
+Die Paare einer Replikation werden bei Bedarf gezogen und in einer Liste gehalten; jede Strategie
+läuft anschließend vollständig auf dieser Liste.
+
+Der Nutzen liegt in den Common Random Numbers, nicht in der Rechenzeit: Jede Strategie wird weiterhin
+einzeln simuliert, eingespart werden nur die Zufallsziehungen. Da alle Strategien dieselben Tasks
+sehen, sind die Kennzahlen pro Replikation gepaart. Konfidenzintervalle für Differenzen zwischen
+Strategien sind dadurch meist deutlich schmaler als bei unabhängigen Läufen.
+"""
+import copy
+from collections import defaultdict
+from typing import Any, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from global_funcs import exp
+from vector_stats import MeanPath, summarize
+
+
+class SharedArrivalStream:
+    """
+    Zieht (Zwischenankunftszeit, Bedienzeit)-Paare bei Bedarf und stellt sie allen Lesern in
+    derselben Reihenfolge bereit. Die Paare einer Replikation bleiben bis zu deren Ende gespeichert.
+    """
+
+    def __init__(self, arrival_rate: float, service_rate: float) -> None:
+        """
+        :param arrival_rate: Ankunftsrate (alpha)
+        :param service_rate: Bedienrate (beta)
+        """
+        self.alpha: float = arrival_rate
+        self.beta: float = service_rate
+        self.pairs: List[Tuple[float, float]] = []
+
+    def stream(self) -> Iterator[Tuple[float, float]]:
+        """
+        Liefert die Paare von Beginn an; fehlende Paare werden nachgezogen.
+        Damit erfüllt der gemeinsame Strom die Schnittstelle trace_source.TraceSource.
+        :return: Iterator über die (Zwischenankunftszeit, Bedienzeit)-Paare
+        """
+        index: int = 0
+        while True:
+            if index == len(self.pairs):
+                self.pairs.append((exp(self.alpha), exp(self.beta)))
+            yield self.pairs[index]
+            index += 1
+
+
+class FanOutRunner:
+    """
+    Führt mehrere Strategien pro Replikation auf einem gemeinsamen Ankunftsstrom aus und
+    sammelt gepaarte Ergebnisse.
+    """
+
+    def __init__(self, arrival_rate: float, service_rate: float, scenarios: Dict[str, Any]) -> None:
+        """
+        :param arrival_rate: Ankunftsrate (alpha) des gemeinsamen Stroms
+        :param service_rate: Bedienrate (beta) des gemeinsamen Stroms
+        :param scenarios: Strategie-Objekte je Name, z.B. {"S1": Strategy1(...), "S2 T=5": Strategy2(...)}
+        :raises ValueError: Wenn ein Szenario trace-getrieben ist, Gradienten schätzt, mit gekippten Raten
+            zieht oder andere Raten als der gemeinsame Strom hat
+        """
+        for name, scenario in scenarios.items():
+            if scenario.trace is not None or scenario.gradients:
+                raise ValueError(f"scenario {name} must use neither a trace nor gradients")
+            if scenario.sampling_alpha != scenario.alpha or scenario.sampling_beta != scenario.beta:
+                raise ValueError(f"scenario {name} must not use tilted sampling rates")
+            if scenario.alpha != arrival_rate or scenario.beta != service_rate:
+                raise ValueError(
+                    f"scenario {name} has rates ({scenario.alpha}, {scenario.beta}), "
+                    f"expected ({arrival_rate}, {service_rate})"
+                )
+        self.alpha: float = arrival_rate
+        self.beta: float = service_rate
+        self.scenarios: Dict[str, Any] = scenarios
+        self.aggregated: Dict[str, Dict[str, List[Any]]] = {name: defaultdict(list) for name in scenarios}
+        self.mean_paths: Dict[str, MeanPath] = {name: MeanPath() for name in scenarios}
+
+    def run_once(self) -> Dict[str, dict]:
+        """
+        Führt eine Replikation aller Strategien auf demselben Ankunftsstrom aus.
+        :return: Ergebnisse je Strategie
+        """
+        shared: SharedArrivalStream = SharedArrivalStream(self.alpha, self.beta)
+        results: Dict[str, dict] = {}
+        for name, scenario in self.scenarios.items():
+            state = copy.deepcopy(scenario)
+            state.trace = shared
+            results[name] = state.run()
+        return results
+
+    def run(self, times: int) -> Dict[str, Dict[str, List[Any]]]:
+        """
+        Führt mehrere Replikationen aus und aggregiert die Ergebnisse je Strategie.
+        :param times: Anzahl der Durchläufe
+        :return: Aggregierte Ergebnisse je Strategie (Listen sind über die Replikationen gepaart)
+        """
+        for _ in range(times):
+            for name, result in self.run_once().items():
+                if "time_series" in result:
+                    self.mean_paths[name].add(result.pop("time_series"))
+                for key, value in result.items():
+                    self.aggregated[name][key].append(value)
+        return self.aggregated
+
+    def paired_difference(self, first: str, second: str, metric: str) -> Tuple[float, float, float]:
+        """
+        Schätzt die mittlere Differenz einer Kennzahl zwischen zwei Strategien aus gepaarten Replikationen.
+        :param first: Name der ersten Strategie
+        :param second: Name der zweiten Strategie
+        :param metric: Kennzahl, z.B. "avg_wait"
+        :return: Mittlere Differenz (first - second), untere und obere Grenze des 95%-t-Konfidenzintervalls
+        :raises ValueError: Bei weniger als zwei Replikationen
+        """
+        differences: np.ndarray = (
+            np.asarray(self.aggregated[first][metric], dtype=float)
+            - np.asarray(self.aggregated[second][metric], dtype=float)
+        )
+        summary: Dict[str, np.ndarray] = summarize(differences)
+        return float(summary["mean"]), float(summary["t_lower"]), float(summary["t_upper"])
+
+
+# Beispiel für die Nutzung:
+# runner = FanOutRunner(1.5, 1.0, {
+#     "S1": Strategy1(1.5, 1.0, 240),
+#     "S2 T=5": Strategy2(1.5, 1.0, 240, 5),
+#     "S2 T=10": Strategy2(1.5, 1.0, 240, 10),
+#     "S2 T=20": Strategy2(1.5, 1.0, 240, 20),
+# })
+# runner.run(1000)
+# runner.paired_difference("S2 T=5", "S2 T=10", "avg_wait")
@@ -1,3 +1,4 @@
+import math
 import random
 
 
@@ -8,3 +9,26 @@ def exp(rate: float) -> float:
     :return: Zufallswert entsprechend der Exponentialverteilung
     """
     return random.expovariate(rate)
+
+
+def exp_score(rate: float, value: float) -> float:
+    """
+    Gibt die Ableitung der logarithmierten Exponentialdichte nach der Rate zurück
+    (Score-Funktion für Likelihood-Ratio-Gradientenschätzer).
+    :param rate: Rateparameter (lambda) der Exponentialverteilung
+    :param value: Gezogener Wert
+    :return: d/d(rate) log(rate * e^(-rate * value)) = 1/rate - value
+    """
+    return 1.0 / rate - value
+
+
+def exp_log_likelihood_ratio(rate: float, sampling_rate: float, value: float) -> float:
+    """
+    Gibt den logarithmierten Likelihood-Quotienten zweier Exponentialdichten zurück
+    (Gewicht für Importance Sampling, wenn mit sampling_rate statt rate gezogen wurde).
+    :param rate: Nominale Rate (lambda) der Exponentialverteilung
+    :param sampling_rate: Tatsächlich verwendete Rate beim Ziehen
+    :param value: Gezogener Wert
+    :return: log(f_rate(value) / f_sampling_rate(value))
+    """
+    return math.log(rate / sampling_rate) + (sampling_rate - rate) * value
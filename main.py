@@ -1,10 +1,15 @@
 import logging
 from typing import Dict, List
 
+import numpy as np
+
 from strategy1 import Strategy1
 from strategy2 import Strategy2
 from scenario_generator import ScenarioGenerator
 from stats import Stats
+from vector_stats import from_aggregated, summarize
+from rare_event import MultilevelSplitting
+from fan_out import FanOutRunner
 from task import Task
 from curve_family import CurveFamily
 from internal_logging import init_logging, switch_to_info
@@ -84,19 +89,24 @@ def analyse_strategy_2_params() -> None:
     Task._id_counter = 1
     result_dict: Dict[int, Dict[str, List[float]]] = {}
     list_alpha: List[float] = [0.8, 1.0, 1.2, 1.4, 1.6, 1.8, 2.0, 2.2, 2.4, 2.6, 2.8]
+    list_T: List[int] = [5, 10, 20]
+    metrics: List[str] = ['discarded', 'avg_wait']
 
     # Berechnung der Ergebnisse für verschiedene Sprintlängen und Ankunftsraten
-    for T in [5, 10, 20]:
-        result_dict[T] = {'discarded': [], 'avg_wait': []}
+    cells: List[Dict[str, List[float]]] = []
+    for T in list_T:
         for alpha in list_alpha:
             s2: Strategy2 = Strategy2(arrival_rate=alpha, service_rate=1.0, simulation_time=240, sprint_length=T)
             scenario_generator: ScenarioGenerator = ScenarioGenerator(s2)
             logging.info(f"Scenario: alpha: {alpha}; T: {T}")
             logging.info(scenario_generator.run(10000))
-            stats_discarded: Stats = Stats(scenario_generator.aggregated["discarded"])
-            stats_avg_wait: Stats = Stats(scenario_generator.aggregated["avg_wait"])
-            result_dict[T]['discarded'].append(stats_discarded.mean())
-            result_dict[T]['avg_wait'].append(stats_avg_wait.mean())
+            cells.append(scenario_generator.aggregated)
+
+    # Statistik für alle Szenarien und Kennzahlen in einem Aufruf, Form (T, alpha, Kennzahl)
+    summary: Dict[str, np.ndarray] = summarize(from_aggregated(cells, metrics))
+    means: np.ndarray = summary["mean"].reshape(len(list_T), len(list_alpha), len(metrics))
+    for i, T in enumerate(list_T):
+        result_dict[T] = {metric: means[i, :, j].tolist() for j, metric in enumerate(metrics)}
     print(result_dict)
 
     curve_titles: List[str] = ["T = 5", "T = 10", "T = 20"]
@@ -125,6 +135,101 @@ def analyse_strategy_2_params() -> None:
     )
 
 
+def sensitivity_strategy_2() -> None:
+    """
+    Sensitivitätsanalyse: Schätzung von d(avg_wait)/d(alpha) und d(avg_wait)/d(beta) mit
+    Konfidenzintervallen aus denselben N = 10000 Replikationen, statt benachbarte Ankunftsraten
+    einzeln zu simulieren und zu differenzieren.
+    """
+    print("Sensitivity of strategy 2")
+    Task._id_counter = 1
+    switch_to_info()
+    s2: Strategy2 = Strategy2(
+        arrival_rate=1.5,
+        service_rate=1.0,
+        simulation_time=240,
+        sprint_length=10,
+        gradients=True
+    )
+    scenario_generator: ScenarioGenerator = ScenarioGenerator(s2)
+    scenario_generator.run(10000)
+    for parameter, (gradient, lower_bound, upper_bound) in scenario_generator.gradients().items():
+        print(f"d(avg_wait)/d({parameter}): {gradient} [{lower_bound}; {upper_bound}]")
+
+
+def rare_events() -> None:
+    """
+    Seltene Ereignisse bei geringer Ankunftsrate, geschätzt per Multilevel Splitting: mehr als 10
+    verworfene Tasks bei Strategie 2 sowie eine Wartezeit von mehr als 15 bei Strategie 1.
+    Bei Strategie 2 ist die Wartezeit stets kleiner als 2T (Bearbeitung im nächsten Sprint oder
+    Verwerfen), Wartezeit-Ausläufer sind daher nur bei Strategie 1 sinnvoll.
+    """
+    print("Rare events")
+    Task._id_counter = 1
+    switch_to_info()
+    s2: Strategy2 = Strategy2(arrival_rate=0.5, service_rate=1.0, simulation_time=240, sprint_length=10)
+    splitting: MultilevelSplitting = MultilevelSplitting(s2, lambda s: len(s.discarded_tasks), [0, 2, 4, 6, 8, 10])
+    splitting.run(times=20, effort=200)
+    print(f"Strategy 2, P(discarded > 10): {splitting.probability()}")
+    s1: Strategy1 = Strategy1(arrival_rate=0.5, service_rate=1.0, simulation_time=240)
+    splitting = MultilevelSplitting(s1, lambda s: s.max_wait, [4, 7, 10, 13, 15])
+    splitting.run(times=20, effort=200)
+    print(f"Strategy 1, P(max_wait > 15): {splitting.probability()}")
+
+
+def time_series_strategy_2() -> None:
+    """
+    Zeitlicher Verlauf unter Überlast: mittlere Buffergröße über N = 1000 Replikationen mit
+    95%-Konfidenzband, aufgezeichnet in 48 Zeitabschnitten (je 5 Zeiteinheiten).
+    """
+    print("Time series of strategy 2")
+    Task._id_counter = 1
+    switch_to_info()
+    s2: Strategy2 = Strategy2(
+        arrival_rate=2.0,
+        service_rate=1.0,
+        simulation_time=240,
+        sprint_length=10,
+        record_buckets=48
+    )
+    scenario_generator: ScenarioGenerator = ScenarioGenerator(s2)
+    scenario_generator.run(1000)
+    band: Dict[str, np.ndarray] = scenario_generator.mean_path.band()["buffer"]
+    x: List[float] = s2.recorder.times()
+
+    curves: CurveFamily = CurveFamily(
+        [x, x, x],
+        [band["mean"].tolist(), band["lower"].tolist(), band["upper"].tolist()]
+    )
+    curves.save(
+        title="Mittlere Buffergröße (alpha = 2.0, T = 10)",
+        curve_titles=["Mittelwert", "untere Grenze", "obere Grenze"],
+        filename="buffer_time_series.png",
+        x_label="Zeit",
+        y_label="Buffergröße"
+    )
+
+
+def compare_strategies() -> None:
+    """
+    Gepaarter Vergleich von Strategie 1 und Strategie 2 (T = 5/10/20) auf einem gemeinsamen
+    Ankunftsstrom: Differenzen der mittleren Wartezeit mit 95%-Konfidenzintervallen.
+    """
+    print("Paired comparison of strategies")
+    Task._id_counter = 1
+    switch_to_info()
+    runner: FanOutRunner = FanOutRunner(1.5, 1.0, {
+        "S1": Strategy1(arrival_rate=1.5, service_rate=1.0, simulation_time=240),
+        "S2 T=5": Strategy2(arrival_rate=1.5, service_rate=1.0, simulation_time=240, sprint_length=5),
+        "S2 T=10": Strategy2(arrival_rate=1.5, service_rate=1.0, simulation_time=240, sprint_length=10),
+        "S2 T=20": Strategy2(arrival_rate=1.5, service_rate=1.0, simulation_time=240, sprint_length=20)
+    })
+    runner.run(10000)
+    for name in ["S2 T=5", "S2 T=10", "S2 T=20"]:
+        mean, lower_bound, upper_bound = runner.paired_difference(name, "S1", "avg_wait")
+        print(f"avg_wait {name} - S1: {mean} [{lower_bound}; {upper_bound}]")
+
+
 if __name__ == "__main__":
     init_logging()
     #example_run_strategy_1()   # Abschnitt 3.1.1
@@ -132,3 +237,7 @@ if __name__ == "__main__":
     #example_run_strategy_2()   # Abschnitt 3.2.1
     analysis_strategy_2()      # Abschnitt 3.2.2
     #analyse_strategy_2_params() # Abschnitt 3.2.3
+    #sensitivity_strategy_2()    # Sensitivitätsanalyse
+    #rare_events()               # Seltene Ereignisse
+    #time_series_strategy_2()    # Zeitreihe unter Überlast
+    #compare_strategies()        # Gepaarter Strategievergleich
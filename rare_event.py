@@ -0,0 +1,235 @@
+"""
+Modul: Schätzung seltener Ereignisse per Importance Sampling und Multilevel Splitting
+
+Wahrscheinlichkeiten wie "mehr als X verworfene Tasks" (Strategie 2) oder "Wartezeit > X"
+(Strategie 1) werden bei kleinen Ankunftsraten in naiven ScenarioGenerator-Läufen kaum je beobachtet.
+
+Importance Sampling (RareEventEstimator):
+Zwischenankunfts- und Bedienzeiten werden mit gekippten Raten (sampling_alpha, sampling_beta)
+gezogen, sodass das Ereignis häufiger eintritt. Jede Replikation wird mit dem Likelihood-Quotienten
+L = Π f_nominal(x) / f_gekippt(x) gewichtet; der Mittelwert von L * 1{Ereignis} ist ein
+erwartungstreuer Schätzer der Wahrscheinlichkeit unter den nominalen Raten.
+Für Überschreitungen monotoner Kennzahlen (max_wait, discarded) nutzt exceedance_probability() das
+Gewicht zum Zeitpunkt der Erstüberschreitung (Optional Stopping). Das bleibt erwartungstreu und ist
+unabhängig von den gekippten Ziehungen nach dem Ereignis, was die Varianz deutlich senkt.
+Da die Kippung über den gesamten Simulationshorizont wirkt, entarten die Gewichte bei starker
+Kippung schnell (wenige riesige Gewichte, Schätzwert und Konfidenzintervall zu klein). Die Raten
+daher nur moderat kippen; jede Schätzung protokolliert effective_sample_size() und warnt, wenn sie
+unter min_effective_fraction der Durchläufe fällt.
+
+Multilevel Splitting (MultilevelSplitting):
+Für Ereignisse, die irgendwo im Horizont eintreten können, ist Splitting meist robuster. Eine
+monotone Kennzahl (z.B. max_wait) muss nacheinander Zwischenschwellen überschreiten; Läufe, die
+eine Schwelle erreichen, werden kopiert und fortgesetzt (Fixed Effort). Das Produkt der bedingten
+Trefferquoten ist erwartungstreu; Konfidenzintervalle ergeben sich aus unabhängigen Wiederholungen.
+"""
+import copy
+import logging
+import math
+import random
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from scenario_generator import ScenarioGenerator
+from vector_stats import summarize
+
+
+class RareEventEstimator:
+    """
+    Führt ein Szenario mit gekippten Raten mehrfach aus und schätzt Ereigniswahrscheinlichkeiten
+    mit Konfidenzintervallen.
+    """
+
+    def __init__(
+        self,
+        scenario_class: Any,
+        sampling_arrival_rate: Optional[float] = None,
+        sampling_service_rate: Optional[float] = None,
+        min_effective_fraction: float = 0.1
+    ) -> None:
+        """
+        :param scenario_class: Strategie-Objekt (Strategy1 oder Strategy2) mit nominalen Raten
+        :param sampling_arrival_rate: Gekippte Ankunftsrate (None: nominale Rate)
+        :param sampling_service_rate: Gekippte Bedienrate (None: nominale Rate)
+        :param min_effective_fraction: Anteil der Durchläufe, unter dem die effektive Stichprobengröße
+            als entartet gewarnt wird
+        :raises ValueError: Wenn das Szenario trace-getrieben ist oder Gradienten schätzt
+        """
+        if scenario_class.trace is not None:
+            raise ValueError("importance sampling requires exponential draws, not a trace")
+        if scenario_class.gradients:
+            raise ValueError("gradients cannot be combined with importance sampling")
+
+        scenario = copy.deepcopy(scenario_class)
+        if sampling_arrival_rate is not None:
+            scenario.sampling_alpha = sampling_arrival_rate
+        if sampling_service_rate is not None:
+            scenario.sampling_beta = sampling_service_rate
+        self.scenario_generator: ScenarioGenerator = ScenarioGenerator(scenario)
+        self.results: List[Dict[str, Any]] = []
+        self.min_effective_fraction: float = min_effective_fraction
+        self.logger = logging.getLogger(__name__)
+
+    def run(self, times: int) -> List[Dict[str, Any]]:
+        """
+        Führt das gekippte Szenario mehrfach aus.
+        :param times: Anzahl der Durchläufe
+        :return: Ergebnisse pro Durchlauf (inkl. Likelihood-Quotient)
+        """
+        aggregated: Dict[str, List[Any]] = self.scenario_generator.run(times)
+        keys: List[str] = list(aggregated.keys())
+        self.results = [dict(zip(keys, values)) for values in zip(*aggregated.values())]
+        return self.results
+
+    def weights(self) -> List[float]:
+        """
+        Gibt die Likelihood-Quotienten aller Durchläufe zurück (1.0, falls nicht gekippt wurde).
+        :return: Liste der Gewichte
+        """
+        return [result.get("likelihood_ratio", 1.0) for result in self.results]
+
+    def probability(self, event: Callable[[Dict[str, Any]], bool]) -> Tuple[float, float, float]:
+        """
+        Schätzt die Wahrscheinlichkeit eines Ereignisses unter den nominalen Raten.
+        :param event: Prädikat auf dem Ergebnis-Dict eines Durchlaufs, z.B. lambda r: r["discarded"] > 20
+        :return: Schätzwert, untere und obere Grenze des 95%-Konfidenzintervalls
+        :raises ValueError: Wenn run() noch nicht ausgeführt wurde
+        """
+        values: List[float] = [
+            weight if event(result) else 0.0 for weight, result in zip(self.weights(), self.results)
+        ]
+        return self._estimate(values)
+
+    def exceedance_probability(self, metric: str, threshold: float) -> Tuple[float, float, float]:
+        """
+        Schätzt P(metric > threshold) mit dem Gewicht zum Zeitpunkt der Erstüberschreitung.
+        :param metric: Monotone Kennzahl aus first_passage, z.B. "max_wait" oder "discarded"
+        :param threshold: Schwellwert
+        :return: Schätzwert, untere und obere Grenze des 95%-Konfidenzintervalls
+        :raises ValueError: Wenn run() noch nicht ausgeführt wurde
+        """
+        values: List[float] = []
+        for result in self.results:
+            if "first_passage" not in result:  # Nicht gekippt: naive Monte-Carlo-Schätzung
+                values.append(1.0 if result[metric] > threshold else 0.0)
+                continue
+            weight: float = 0.0
+            for level, log_likelihood_ratio in result["first_passage"][metric]:
+                if level > threshold:
+                    weight = math.exp(log_likelihood_ratio)
+                    break
+            values.append(weight)
+        return self._estimate(values)
+
+    def _estimate(self, values: List[float]) -> Tuple[float, float, float]:
+        """
+        Mittelt gewichtete Indikatoren zu einem Schätzwert mit t-Konfidenzintervall und protokolliert
+        die effektive Stichprobengröße; bei entarteten Gewichten ist das Intervall zu schmal.
+        :param values: Gewichtete Indikatoren je Durchlauf
+        :return: Schätzwert, untere und obere Grenze des 95%-Konfidenzintervalls
+        :raises ValueError: Bei weniger als zwei Durchläufen
+        """
+        effective_sample_size: float = self.effective_sample_size()
+        self.logger.info(
+            f"importance sampling: effective sample size {effective_sample_size:.1f} of {len(values)} runs"
+        )
+        if effective_sample_size < self.min_effective_fraction * len(values):
+            self.logger.warning(
+                f"importance sampling: effective sample size {effective_sample_size:.1f} of {len(values)} runs, "
+                f"weights are degenerate and the interval is likely too narrow; reduce the tilt"
+            )
+        summary: Dict[str, np.ndarray] = summarize(values)
+        return float(summary["mean"]), max(0.0, float(summary["t_lower"])), float(summary["t_upper"])
+
+    def effective_sample_size(self) -> float:
+        """
+        Effektive Stichprobengröße (Σ L)² / Σ L² der Gewichte; deutlich kleiner als die Anzahl der
+        Durchläufe deutet auf eine zu starke Kippung hin.
+        :return: Effektive Stichprobengröße
+        """
+        weights: List[float] = self.weights()
+        sum_squares: float = sum(weight ** 2 for weight in weights)
+        return sum(weights) ** 2 / sum_squares if sum_squares > 0 else 0.0
+
+
+class MultilevelSplitting:
+    """
+    Schätzt P(level_function(Szenario) > levels[-1]) per Fixed-Effort Multilevel Splitting.
+    """
+
+    def __init__(self, scenario_class: Any, level_function: Callable[[Any], float], levels: List[float]) -> None:
+        """
+        :param scenario_class: Strategie-Objekt (Strategy1 oder Strategy2) mit nominalen Raten
+        :param level_function: Monotone Kennzahl des Laufzustands, z.B. lambda s: s.max_wait
+        :param levels: Aufsteigende Schwellen; die letzte ist das eigentliche Ereignis
+        :raises ValueError: Wenn die Schwellen nicht aufsteigend sind oder das Szenario trace-getrieben ist
+        """
+        if not levels or any(low >= high for low, high in zip(levels, levels[1:])):
+            raise ValueError("levels must be a non-empty, strictly increasing list")
+        if scenario_class.trace is not None:
+            raise ValueError("splitting requires exponential draws, not a trace")
+        self.scenario_class: Any = scenario_class
+        self.level_function: Callable[[Any], float] = level_function
+        self.levels: List[float] = levels
+        self.estimates: List[float] = []
+        self.logger = logging.getLogger(__name__)
+
+    def run_once(self, effort: int) -> float:
+        """
+        Führt einen Splitting-Durchgang mit effort Läufen pro Stufe aus.
+        :param effort: Anzahl der Läufe pro Stufe
+        :return: Schätzwert der Wahrscheinlichkeit (Produkt der Trefferquoten)
+        """
+        states: List[Any] = [copy.deepcopy(self.scenario_class) for _ in range(effort)]
+        for state in states:
+            state.start()
+
+        estimate: float = 1.0
+        for level in self.levels:
+            hits: List[Any] = [
+                state for state in states
+                if state.advance(lambda s=state: self.level_function(s) > level)
+            ]
+            estimate *= len(hits) / len(states)
+            if not hits:
+                self.logger.warning(f"splitting: no run out of {len(states)} exceeded level {level}")
+                return 0.0
+            # Fixed Effort: Startzustände der nächsten Stufe gleichverteilt aus den Treffern kopieren
+            states = [copy.deepcopy(random.choice(hits)) for _ in range(effort)]
+        return estimate
+
+    def run(self, times: int, effort: int) -> List[float]:
+        """
+        Wiederholt das Splitting unabhängig, um ein Konfidenzintervall zu erhalten.
+        :param times: Anzahl der unabhängigen Wiederholungen
+        :param effort: Anzahl der Läufe pro Stufe
+        :return: Schätzwerte aller Wiederholungen
+        """
+        for _ in range(times):
+            self.estimates.append(self.run_once(effort))
+        return self.estimates
+
+    def probability(self) -> Tuple[float, float, float]:
+        """
+        Schätzt die Wahrscheinlichkeit aus allen bisherigen Wiederholungen. Da meist nur wenige
+        Wiederholungen vorliegen, wird ein t-Konfidenzintervall mit Stichproben-Standardabweichung verwendet.
+        :return: Schätzwert, untere und obere Grenze des 95%-Konfidenzintervalls
+        :raises ValueError: Bei weniger als zwei Wiederholungen oder wenn keine Wiederholung die letzte
+            Schwelle erreicht hat (Ereignis unmöglich oder Schwellen zu weit auseinander)
+        """
+        if len(self.estimates) >= 2 and not any(self.estimates):
+            raise ValueError("no repetition reached the final level, the interval would be degenerate")
+        summary: Dict[str, np.ndarray] = summarize(self.estimates)
+        return float(summary["mean"]), max(0.0, float(summary["t_lower"])), float(summary["t_upper"])
+
+
+# Beispiel für die Nutzung:
+# s2 = Strategy2(arrival_rate=0.8, service_rate=1.0, simulation_time=240, sprint_length=10)
+# estimator = RareEventEstimator(s2, sampling_arrival_rate=1.2)
+# estimator.run(1000)
+# estimator.probability(lambda result: result["discarded"] > 20)
+# estimator.exceedance_probability("discarded", 20)
+# splitting = MultilevelSplitting(s2, lambda s: len(s.discarded_tasks), levels=[5, 10, 15, 20])
+# splitting.run(times=20, effort=200)
+# splitting.probability()
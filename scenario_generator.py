@@ -1,11 +1,18 @@
 import copy
 from collections import defaultdict
-from typing import Any, Callable, Dict, List
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+
+from vector_stats import MeanPath, likelihood_ratio_gradient, summarize
 
 
 class ScenarioGenerator:
     """
     Führt mehrere Simulationen eines Szenarios aus und aggregiert die Ergebnisse.
+    Zeitreihen (Schlüssel "time_series") werden nicht pro Lauf gespeichert, sondern in mean_path gemittelt.
+    Terme der Gradientenschätzung (Schlüssel "gradients") werden getrennt von den Kennzahlen in
+    gradient_terms gesammelt und mit gradients() ausgewertet.
     """
 
     def __init__(self, scenario_class: Any) -> None:
@@ -14,6 +21,8 @@ class ScenarioGenerator:
         """
         self.scenario_class: Any = scenario_class
         self.aggregated: Dict[str, List[Any]] = defaultdict(list)
+        self.mean_path: MeanPath = MeanPath()
+        self.gradient_terms: Dict[str, List[float]] = defaultdict(list)
 
     def run(self, times: int) -> Dict[str, List[Any]]:
         """
@@ -24,9 +33,38 @@ class ScenarioGenerator:
         for _ in range(times):
             temp_scenario = copy.deepcopy(self.scenario_class)  # Sicherstellen, dass jedes Mal ein frisches Objekt verwendet wird
             result = temp_scenario.run()
+            if "time_series" in result:
+                self.mean_path.add(result.pop("time_series"))
+            for key, value in result.pop("gradients", {}).items():
+                self.gradient_terms[key].append(value)
             for key, value in result.items():
                 self.aggregated[key].append(value)
 
         self.aggregated = dict(self.aggregated)
 
         return self.aggregated
+
+    def gradients(self, confidence: float = 0.95) -> Dict[str, Tuple[float, float, float]]:
+        """
+        Schätzt d(avg_wait)/d(alpha) und d(avg_wait)/d(beta) aus den gesammelten Gradiententermen
+        (Szenario mit gradients=True). Score-Funktionen (score_<parameter>) werden per
+        Likelihood-Ratio-Methode mit avg_wait kombiniert, pfadweise Ableitungen (d_avg_wait_d_<parameter>)
+        direkt gemittelt.
+        :param confidence: Konfidenzniveau
+        :return: Dict Parameter -> (Schätzwert, untere Grenze, obere Grenze des t-Konfidenzintervalls)
+        :raises ValueError: Wenn keine Gradiententerme gesammelt wurden oder weniger als zwei Läufe vorliegen
+        """
+        if not self.gradient_terms:
+            raise ValueError("no gradient terms collected, run a scenario with gradients=True")
+        result: Dict[str, Tuple[float, float, float]] = {}
+        for key, values in self.gradient_terms.items():
+            if key.startswith("score_"):
+                result[key[len("score_"):]] = likelihood_ratio_gradient(
+                    self.aggregated["avg_wait"], values, confidence
+                )
+            else:
+                summary: Dict[str, np.ndarray] = summarize(values, confidence)
+                result[key[len("d_avg_wait_d_"):]] = (
+                    float(summary["mean"]), float(summary["t_lower"]), float(summary["t_upper"])
+                )
+        return result
@@ -21,26 +21,60 @@ Ausgaben der Simulation:
 - Mittlere Wartezeit
 - Mittlere Schlangenlänge
 - Auslastungsgrad
+- Größte Wartezeit eines einzelnen Tasks
+- Optional: Terme zur Schätzung der Sensitivitäten der mittleren Wartezeit nach alpha und beta
+- Optional: Likelihood-Quotient bei Importance Sampling (siehe rare_event)
+- Optional: Zeitreihe der Schlangenlänge und des Serverstatus je Zeitabschnitt (siehe time_series)
+
+Gradientenschätzung (gradients=True):
+Pro Lauf wird unter dem Schlüssel "gradients" ein Dict mit Schätztermen zurückgegeben, die der
+ScenarioGenerator getrennt von den Kennzahlen sammelt; ScenarioGenerator.gradients() liefert daraus
+beide Gradienten mit Konfidenzintervallen.
+- d(avg_wait)/d(beta) per Infinitesimal Perturbation Analysis (IPA): Die Bedienzeiten b_i = E_i / beta
+  werden entlang der Lindley-Rekursion der Fertigstellungszeiten e_i differenziert. Der Term
+  d_avg_wait_d_beta ist bereits die Ableitung des Laufs.
+- d(avg_wait)/d(alpha) per Likelihood-Ratio-Schätzer: Der Term score_alpha = Σ (1/alpha - a_i) ist die
+  Score-Funktion über alle gezogenen Zwischenankunftszeiten; der Gradient ist Cov(avg_wait, score_alpha)
+  über die Replikationen. IPA ist hier nicht erwartungstreu, da die Anzahl der Tasks bis zur
+  Simulationszeit von alpha abhängt.
 """
 import logging
-from typing import List
+import math
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 from event import Event
 from event_queue import EventQueue
 from task import Task
-from global_funcs import exp
+from time_series import TimeSeriesRecorder
+from trace_source import TraceSource
+from global_funcs import exp, exp_log_likelihood_ratio, exp_score
 
 
 class Strategy1:
     """
     Strategie 1: FIFO-Simulation eines Einkanal-Bedienungssystems (M/M/1).
     """
-    def __init__(self, arrival_rate: float, service_rate: float, simulation_time: float) -> None:
+    def __init__(
+        self,
+        arrival_rate: float,
+        service_rate: float,
+        simulation_time: float,
+        gradients: bool = False,
+        trace: Optional[TraceSource] = None,
+        record_buckets: int = 0
+    ) -> None:
         """
         Initialisiert die Simulationsparameter und Zustandsvariablen.
         :param arrival_rate: Ankunftsrate (alpha)
         :param service_rate: Bedienrate (beta)
         :param simulation_time: Maximale Simulationszeit
+        :param gradients: Zusätzlich Terme zur Schätzung von d(avg_wait)/d(alpha) und d(avg_wait)/d(beta)
+            zurückgeben (Auswertung über ScenarioGenerator.gradients())
+        :param trace: Optionale Trace-Quelle, die anstelle der Exponentialverteilungen abgespielt wird
+        :param record_buckets: Anzahl der Zeitabschnitte für die Zeitreihen-Aufzeichnung (0: keine Aufzeichnung)
+        :raises ValueError: Wenn Gradientenschätzung und Trace gleichzeitig gesetzt sind
         """
+        if gradients and trace is not None:
+            raise ValueError("gradients cannot be estimated for trace-driven runs")
         self.alpha: float = arrival_rate  # Ankunftsrate
         self.beta: float = service_rate   # Bedienrate
         self.sim_time: float = simulation_time  # Simulationszeit
@@ -51,23 +85,107 @@ class Strategy1:
 
         self.queue: List[Task] = []        # FIFO-Warteschlange
         self.server_busy: bool = False     # Status des Servers
+        self.finished: bool = False        # Simulationszeit erreicht
         self.event_queue: EventQueue = EventQueue()  # Ereigniswarteschlange
 
         self.completed_tasks: List[Task] = []  # Liste der abgeschlossenen Tasks
 
         # Für Tabellen-Ausgabe und Statistik
         self.last_arrival_time: float = 0.0
+        self.last_task_e_i: float = 0.0    # Zeitpunkt des letzten Task-Endes
         self.total_service_time: float = 0.0
         self.total_wait_time: float = 0.0
+        self.max_wait: float = 0.0
+
+        # Für Gradientenschätzung
+        self.gradients: bool = gradients
+        self.score_alpha: float = 0.0      # Σ d/d(alpha) log f(a_i) (Likelihood-Ratio)
+        self.d_last_e_beta: float = 0.0    # d(e_i)/d(beta) des letzten Tasks (IPA)
+        self.d_total_wait_beta: float = 0.0  # d(Σ w_i)/d(beta) (IPA)
+
+        # Für Importance Sampling: Ziehen mit gekippten Raten, Gewichtung mit dem Likelihood-Quotienten
+        self.sampling_alpha: float = arrival_rate
+        self.sampling_beta: float = service_rate
+        self.log_likelihood_ratio: float = 0.0
+        # Neue Höchstwerte je Kennzahl mit dem log. Likelihood-Quotienten zu diesem Zeitpunkt (Erstüberschreitung)
+        self.first_passage: Dict[str, List[Tuple[float, float]]] = {"max_wait": []}
+
+        # Für trace-getriebene Läufe: Bedienzeit gehört zur zuletzt geplanten Ankunft
+        self.trace: Optional[TraceSource] = trace
+        self.trace_stream: Optional[Iterator[Tuple[float, float]]] = None
+        self.trace_service: float = 0.0
+
+        # Optionale Zeitreihen-Aufzeichnung des Systemzustands
+        self.recorder: Optional[TimeSeriesRecorder] = None
+        if record_buckets > 0:
+            self.recorder = TimeSeriesRecorder(
+                sim_time=simulation_time,
+                signals=("queue_len", "busy"),
+                buckets=record_buckets
+            )
         self.logger = logging.getLogger(__name__)
 
+    def record_state(self, now: float) -> None:
+        """
+        Übergibt den bis now gültigen Systemzustand an die Zeitreihen-Aufzeichnung.
+        :param now: Aktuelle Simulationszeit
+        """
+        if self.recorder is not None:
+            self.recorder.record(now, (len(self.queue), self.server_busy))
+
+    def record_level(self, metric: str, value: float) -> None:
+        """
+        Merkt sich bei Importance Sampling den log. Likelihood-Quotienten, wenn eine Kennzahl einen
+        neuen Höchstwert erreicht. Damit lassen sich Überschreitungswahrscheinlichkeiten mit dem
+        Gewicht zum Zeitpunkt der Erstüberschreitung schätzen (geringere Varianz als das Gesamtgewicht).
+        :param metric: Name der Kennzahl (Schlüssel in first_passage)
+        :param value: Neuer Höchstwert
+        """
+        if self.sampling_alpha != self.alpha or self.sampling_beta != self.beta:
+            self.first_passage[metric].append((value, self.log_likelihood_ratio))
+
     def schedule_initial_events(self) -> None:
         """
-        Plant das erste Ankunftsereignis.
+        Plant das erste Ankunftsereignis (bei trace-getriebenen Läufen wird die Trace geöffnet).
         """
-        first_arrival: float = exp(self.alpha)
+        if self.trace is not None:
+            self.trace_stream = self.trace.stream()
+        first_arrival: float = self.draw_interarrival()
+        if first_arrival == math.inf:  # Leere Trace
+            return
         self.event_queue.push(Event(int(first_arrival), Event.ARRIVAL))  # Typkonvertierung zu int
 
+    def draw_interarrival(self) -> float:
+        """
+        Zieht eine Zwischenankunftszeit (mit sampling_alpha) und aktualisiert Score-Funktion und
+        Likelihood-Quotient nach alpha.
+        Bei trace-getriebenen Läufen wird der nächste Datensatz gelesen; nach dem Ende der Trace
+        erfolgen keine weiteren Ankünfte.
+        :return: Zwischenankunftszeit
+        """
+        if self.trace_stream is not None:
+            a_i, self.trace_service = next(self.trace_stream, (math.inf, 0.0))
+            return a_i
+        a_i: float = exp(self.sampling_alpha)
+        self.score_alpha += exp_score(self.alpha, a_i)
+        if self.sampling_alpha != self.alpha:
+            self.log_likelihood_ratio += exp_log_likelihood_ratio(self.alpha, self.sampling_alpha, a_i)
+        return a_i
+
+    def draw_service(self) -> float:
+        """
+        Zieht eine Bedienzeit (mit sampling_beta) und aktualisiert den Likelihood-Quotienten.
+        Bei trace-getriebenen Läufen wird die aufgezeichnete Bearbeitungsdauer der zuletzt
+        geplanten Ankunft verwendet.
+        :return: Bedienzeit
+        """
+        if self.trace_stream is not None:
+            return self.trace_service
+        b_i: float = exp(self.sampling_beta)
+        if self.sampling_beta != self.beta:
+            self.log_likelihood_ratio += exp_log_likelihood_ratio(self.beta, self.sampling_beta, b_i)
+        return b_i
+
     def print(self, text: str) -> None:
         """
         Gibt Text als Debug-Log aus (für Tabellen-Ausgabe).
@@ -80,6 +198,14 @@ class Strategy1:
         Führt die Simulation aus und berechnet die Kennzahlen.
         :return: Dictionary mit Ergebnissen (Anzahl, mittlere Wartezeit, etc.)
         """
+        self.start()
+        self.advance()
+        return self.results()
+
+    def start(self) -> None:
+        """
+        Plant die Anfangsereignisse und gibt den Tabellenkopf aus.
+        """
         self.schedule_initial_events()
 
         # Tabellenkopf für Debug-Ausgabe
@@ -87,8 +213,16 @@ class Strategy1:
         self.print("| id   | a_i       | t_i       | b_i       | e_i       | w_i     | Σ Bedienzeit         | Σ Wartezeit        |")
         self.print("+------+-----------+-----------+-----------+-----------+---------+----------------------+--------------------+")
 
-        last_task_e_i: float = 0.0  # Zeitpunkt des letzten Task-Endes
-        while not self.event_queue.empty():
+    def advance(self, stop: Optional[Callable[[], bool]] = None) -> bool:
+        """
+        Verarbeitet Ereignisse bis zur Simulationszeit oder bis die Abbruchbedingung erfüllt ist.
+        Erlaubt das Fortsetzen eines Laufs, z.B. für Multilevel Splitting (siehe rare_event).
+        :param stop: Optionale Abbruchbedingung, die vor jedem Ereignis geprüft wird
+        :return: True, wenn die Abbruchbedingung erfüllt wurde, sonst False (Simulationsende)
+        """
+        while not self.finished and not self.event_queue.empty():
+            if stop is not None and stop():
+                return True
             event: Event = self.event_queue.pop()
             current_time: float = event.time
 
@@ -102,24 +236,47 @@ class Strategy1:
 
             self.last_event_time = current_time
 
+            self.record_state(current_time)
             if event.type == Event.ARRIVAL:
-                last_task_e_i = self.handle_arrival(current_time, last_task_e_i)
+                self.last_task_e_i = self.handle_arrival(current_time, self.last_task_e_i)
             elif event.type == Event.DEPARTURE:
                 self.handle_departure(event, current_time)
 
+        self.record_state(self.sim_time)
+        self.finished = True
+        return stop is not None and stop()
+
+    def results(self) -> dict:
+        """
+        Berechnet die Kennzahlen des (bis hierhin) simulierten Laufs.
+        :return: Dictionary mit Ergebnissen (Anzahl, mittlere Wartezeit, etc.)
+        """
         # Ergebnisberechnung
         num_completed: int = len(self.completed_tasks)
         queue_len_end: int = len(self.queue)
         avg_wait: float = self.total_wait_time / (queue_len_end + num_completed) if (queue_len_end + num_completed) > 0 else 0.0
-        avg_queue_len: float = self.total_wait_time / last_task_e_i if last_task_e_i > 0 else 0.0
-        utilization: float = self.total_service_time / last_task_e_i if last_task_e_i > 0 else 0.0
-        return {
+        avg_queue_len: float = self.total_wait_time / self.last_task_e_i if self.last_task_e_i > 0 else 0.0
+        utilization: float = self.total_service_time / self.last_task_e_i if self.last_task_e_i > 0 else 0.0
+        result: dict = {
             "completed": num_completed,
             "queue_len_end": queue_len_end,
             "avg_wait": avg_wait,
             "avg_queue_len": avg_queue_len,
-            "utilization": utilization
+            "utilization": utilization,
+            "max_wait": self.max_wait
         }
+        if self.sampling_alpha != self.alpha or self.sampling_beta != self.beta:
+            result["likelihood_ratio"] = math.exp(self.log_likelihood_ratio)
+            result["first_passage"] = self.first_passage
+        if self.recorder is not None:
+            result["time_series"] = self.recorder.series()
+        if self.gradients:
+            num_tasks: int = queue_len_end + num_completed
+            result["gradients"] = {
+                "score_alpha": self.score_alpha,
+                "d_avg_wait_d_beta": self.d_total_wait_beta / num_tasks if num_tasks > 0 else 0.0
+            }
+        return result
 
     def handle_arrival(self, now: float, last_task_e_i: float) -> float:
         """
@@ -132,12 +289,20 @@ class Strategy1:
         self.last_arrival_time = now
 
         task: Task = Task(arrival_time=now)
-        task.service_time = exp(self.beta)  # Bedienzeit ziehen
+        task.service_time = self.draw_service()  # Bedienzeit ziehen
         b_i: float = task.service_time
         self.queue.append(task)
 
         # Nächste Ankunft planen
-        self.event_queue.push(Event(now + exp(self.alpha), Event.ARRIVAL))
+        self.event_queue.push(Event(now + self.draw_interarrival(), Event.ARRIVAL))
+
+        # IPA: b_i = E_i / beta => d(b_i)/d(beta) = -b_i / beta; Wartezeit hängt nur bei Stau an e_(i-1)
+        d_b_i: float = -b_i / self.beta
+        if last_task_e_i > task.arrival_time:
+            self.d_total_wait_beta += self.d_last_e_beta
+            self.d_last_e_beta += d_b_i
+        else:
+            self.d_last_e_beta = d_b_i
 
         # Zeitpunkt, zu dem dieser Task fertig ist
         task_e_i: float = max(task.arrival_time, last_task_e_i) + b_i
@@ -148,6 +313,9 @@ class Strategy1:
         self.total_service_time += b_i
         current_wait: float = max(0.0, last_task_e_i - task.arrival_time)  # 0.0 statt 0 für float
         self.total_wait_time += current_wait
+        if current_wait > self.max_wait:
+            self.max_wait = current_wait
+            self.record_level("max_wait", current_wait)
 
         # Tabellenzeile für Debug-Ausgabe
         self.print(
@@ -19,15 +19,32 @@ Ausgaben der Simulation:
 - Anzahl der vollständig bearbeiteten Tasks
 - Anzahl der verworfenen Tasks
 - Mittlere Wartezeit der bearbeiteten Tasks
+- Größte Wartezeit eines einzelnen Tasks
+- Optional: Terme zur Schätzung der Sensitivitäten der mittleren Wartezeit nach alpha und beta
+- Optional: Likelihood-Quotient bei Importance Sampling (siehe rare_event)
+- Optional: Zeitreihe von Buffergröße, Sprint-Schlange und Serverstatus je Zeitabschnitt (siehe time_series)
+
+Gradientenschätzung (gradients=True):
+Pro Lauf wird unter dem Schlüssel "gradients" ein Dict mit Schätztermen zurückgegeben, die der
+ScenarioGenerator getrennt von den Kennzahlen sammelt; ScenarioGenerator.gradients() liefert daraus
+beide Gradienten mit Konfidenzintervallen.
+- d(avg_wait)/d(alpha) und d(avg_wait)/d(beta) per Likelihood-Ratio-Schätzer: Die Terme score_alpha
+  bzw. score_beta = Σ (1/rate - x) sind die Score-Funktionen aller gezogenen Zwischenankunfts- bzw.
+  Bedienzeiten; der Gradient ist Cov(avg_wait, score) über die Replikationen.
+- IPA ist hier nicht erwartungstreu: Sprintgrenzen und Simulationsende entscheiden diskret darüber,
+  welche Tasks bearbeitet werden, sodass avg_wait in alpha und beta unstetig ist.
 """
 import random
 import logging
-from typing import List
+import math
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 
 from event import Event
 from event_queue import EventQueue
-from global_funcs import exp
+from global_funcs import exp, exp_log_likelihood_ratio, exp_score
 from task import Task
+from time_series import TimeSeriesRecorder
+from trace_source import TraceSource
 
 
 class Strategy2:
@@ -35,18 +52,35 @@ class Strategy2:
     Strategie 2: Sprints mit zufälliger Auswahl und Kapazitätsgrenze.
     Aufgaben werden in Sprints gesammelt und dann zufällig ausgewählt und bearbeitet.
     """
-    def __init__(self, arrival_rate: float, service_rate: float, simulation_time: int, sprint_length: int) -> None:
+    def __init__(
+        self,
+        arrival_rate: float,
+        service_rate: float,
+        simulation_time: int,
+        sprint_length: int,
+        gradients: bool = False,
+        trace: Optional[TraceSource] = None,
+        record_buckets: int = 0
+    ) -> None:
         """
         Initialisiert die Simulationsparameter und Zustandsvariablen.
         :param arrival_rate: Ankunftsrate (alpha)
         :param service_rate: Bedienrate (beta)
         :param simulation_time: Maximale Simulationszeit
         :param sprint_length: Länge eines Sprints (Kapazität und Intervall)
+        :param gradients: Zusätzlich Terme zur Schätzung von d(avg_wait)/d(alpha) und d(avg_wait)/d(beta)
+            zurückgeben (Auswertung über ScenarioGenerator.gradients())
+        :param trace: Optionale Trace-Quelle, die anstelle der Exponentialverteilungen abgespielt wird
+        :param record_buckets: Anzahl der Zeitabschnitte für die Zeitreihen-Aufzeichnung (0: keine Aufzeichnung)
+        :raises ValueError: Wenn Gradientenschätzung und Trace gleichzeitig gesetzt sind
         """
+        if gradients and trace is not None:
+            raise ValueError("gradients cannot be estimated for trace-driven runs")
         self.alpha: float = arrival_rate
         self.beta: float = service_rate
         self.sim_time: int = simulation_time
         self.total_wait_time: float = 0.0  # Typ float für Wartezeit, auch wenn sim_time int ist
+        self.max_wait: float = 0.0
 
         self.T: int = sprint_length
         self.capacity: int = sprint_length
@@ -54,10 +88,37 @@ class Strategy2:
         self.buffer: List[Task] = []  # Tasks, die im Sprint gesammelt werden
         self.sprint_queue: List[Task] = []  # Tasks, die im Sprint tatsächlich bearbeitet werden
         self.server_busy: bool = False
+        self.finished: bool = False  # Simulationszeit erreicht
         self.event_queue: EventQueue = EventQueue()
 
         self.completed_tasks: List[Task] = []
         self.discarded_tasks: List[Task] = []
+
+        # Für Gradientenschätzung (Likelihood-Ratio)
+        self.gradients: bool = gradients
+        self.score_alpha: float = 0.0  # Σ d/d(alpha) log f(a_i)
+        self.score_beta: float = 0.0   # Σ d/d(beta) log f(b_i)
+
+        # Für Importance Sampling: Ziehen mit gekippten Raten, Gewichtung mit dem Likelihood-Quotienten
+        self.sampling_alpha: float = arrival_rate
+        self.sampling_beta: float = service_rate
+        self.log_likelihood_ratio: float = 0.0
+        # Neue Höchstwerte je Kennzahl mit dem log. Likelihood-Quotienten zu diesem Zeitpunkt (Erstüberschreitung)
+        self.first_passage: Dict[str, List[Tuple[float, float]]] = {"max_wait": [], "discarded": []}
+
+        # Für trace-getriebene Läufe: Bedienzeit gehört zur zuletzt geplanten Ankunft
+        self.trace: Optional[TraceSource] = trace
+        self.trace_stream: Optional[Iterator[Tuple[float, float]]] = None
+        self.trace_service: float = 0.0
+
+        # Optionale Zeitreihen-Aufzeichnung des Systemzustands
+        self.recorder: Optional[TimeSeriesRecorder] = None
+        if record_buckets > 0:
+            self.recorder = TimeSeriesRecorder(
+                sim_time=simulation_time,
+                signals=("buffer", "queue_len", "busy"),
+                buckets=record_buckets
+            )
         self.logger = logging.getLogger(__name__)
 
     def print(self, text: str) -> None:
@@ -67,12 +128,64 @@ class Strategy2:
         """
         self.logger.debug(text)
 
+    def draw_interarrival(self) -> float:
+        """
+        Zieht eine Zwischenankunftszeit (mit sampling_alpha) und aktualisiert Score-Funktion und
+        Likelihood-Quotient nach alpha.
+        Bei trace-getriebenen Läufen wird der nächste Datensatz gelesen; nach dem Ende der Trace
+        erfolgen keine weiteren Ankünfte.
+        :return: Zwischenankunftszeit
+        """
+        if self.trace_stream is not None:
+            a_i, self.trace_service = next(self.trace_stream, (math.inf, 0.0))
+            return a_i
+        a_i: float = exp(self.sampling_alpha)
+        self.score_alpha += exp_score(self.alpha, a_i)
+        if self.sampling_alpha != self.alpha:
+            self.log_likelihood_ratio += exp_log_likelihood_ratio(self.alpha, self.sampling_alpha, a_i)
+        return a_i
+
+    def draw_service(self) -> float:
+        """
+        Zieht eine Bedienzeit (mit sampling_beta) und aktualisiert Score-Funktion und
+        Likelihood-Quotient nach beta.
+        :return: Bedienzeit
+        """
+        b_i: float = exp(self.sampling_beta)
+        self.score_beta += exp_score(self.beta, b_i)
+        if self.sampling_beta != self.beta:
+            self.log_likelihood_ratio += exp_log_likelihood_ratio(self.beta, self.sampling_beta, b_i)
+        return b_i
+
+    def record_state(self, now: float) -> None:
+        """
+        Übergibt den bis now gültigen Systemzustand an die Zeitreihen-Aufzeichnung.
+        :param now: Aktuelle Simulationszeit
+        """
+        if self.recorder is not None:
+            self.recorder.record(now, (len(self.buffer), len(self.sprint_queue), self.server_busy))
+
+    def record_level(self, metric: str, value: float) -> None:
+        """
+        Merkt sich bei Importance Sampling den log. Likelihood-Quotienten, wenn eine Kennzahl einen
+        neuen Höchstwert erreicht. Damit lassen sich Überschreitungswahrscheinlichkeiten mit dem
+        Gewicht zum Zeitpunkt der Erstüberschreitung schätzen (geringere Varianz als das Gesamtgewicht).
+        :param metric: Name der Kennzahl (Schlüssel in first_passage)
+        :param value: Neuer Höchstwert
+        """
+        if self.sampling_alpha != self.alpha or self.sampling_beta != self.beta:
+            self.first_passage[metric].append((value, self.log_likelihood_ratio))
+
     def schedule_initial_events(self) -> None:
         """
-        Plant das erste Ankunfts- und Sprint-Ereignis.
+        Plant das erste Ankunfts- und Sprint-Ereignis (bei trace-getriebenen Läufen wird die Trace geöffnet).
         """
+        if self.trace is not None:
+            self.trace_stream = self.trace.stream()
+        first_arrival: float = self.draw_interarrival()
         # Zeitpunkte müssen als int übergeben werden
-        self.event_queue.push(Event(int(exp(self.alpha)), Event.ARRIVAL))
+        if first_arrival != math.inf:  # Leere Trace
+            self.event_queue.push(Event(int(first_arrival), Event.ARRIVAL))
         self.event_queue.push(Event(self.T, Event.SPRINT))
 
     def run(self) -> dict:
@@ -80,18 +193,37 @@ class Strategy2:
         Führt die Simulation aus und berechnet die Kennzahlen.
         :return: Dictionary mit Ergebnissen (Anzahl, verworfene Tasks, mittlere Wartezeit)
         """
+        self.start()
+        self.advance()
+        return self.results()
+
+    def start(self) -> None:
+        """
+        Plant die Anfangsereignisse und gibt den Tabellenkopf aus.
+        """
         self.schedule_initial_events()
 
         self.print("+------+-----------+-----------+-----------+-----------+-----------+--------------------+----------+")
         self.print("| id   | a_i       | t_i       | b_i       | e_i       | w_i       | Σ Wartezeit        | Sprint   |")
         self.print("+------+-----------+-----------+-----------+-----------+-----------+--------------------+----------+")
-        while not self.event_queue.empty():
+
+    def advance(self, stop: Optional[Callable[[], bool]] = None) -> bool:
+        """
+        Verarbeitet Ereignisse bis zur Simulationszeit oder bis die Abbruchbedingung erfüllt ist.
+        Erlaubt das Fortsetzen eines Laufs, z.B. für Multilevel Splitting (siehe rare_event).
+        :param stop: Optionale Abbruchbedingung, die vor jedem Ereignis geprüft wird
+        :return: True, wenn die Abbruchbedingung erfüllt wurde, sonst False (Simulationsende)
+        """
+        while not self.finished and not self.event_queue.empty():
+            if stop is not None and stop():
+                return True
             event: Event = self.event_queue.pop()
             current_time: float = event.time
 
             if current_time > self.sim_time:
                 break
 
+            self.record_state(current_time)
             if event.type == Event.ARRIVAL:
                 self.handle_arrival(current_time)
             elif event.type == Event.SPRINT:
@@ -99,11 +231,30 @@ class Strategy2:
             elif event.type == Event.DEPARTURE:
                 self.handle_departure(event, current_time)
 
-        return {
+        self.record_state(self.sim_time)
+        self.finished = True
+        return stop is not None and stop()
+
+    def results(self) -> dict:
+        """
+        Berechnet die Kennzahlen des (bis hierhin) simulierten Laufs.
+        :return: Dictionary mit Ergebnissen (Anzahl, verworfene Tasks, mittlere Wartezeit)
+        """
+        avg_wait: float = self.total_wait_time / len(self.completed_tasks) if self.completed_tasks else 0.0
+        result: dict = {
             "completed": len(self.completed_tasks),
             "discarded": len(self.discarded_tasks),
-            "avg_wait": self.total_wait_time / len(self.completed_tasks) if self.completed_tasks else 0.0
+            "avg_wait": avg_wait,
+            "max_wait": self.max_wait
         }
+        if self.sampling_alpha != self.alpha or self.sampling_beta != self.beta:
+            result["likelihood_ratio"] = math.exp(self.log_likelihood_ratio)
+            result["first_passage"] = self.first_passage
+        if self.recorder is not None:
+            result["time_series"] = self.recorder.series()
+        if self.gradients:
+            result["gradients"] = {"score_alpha": self.score_alpha, "score_beta": self.score_beta}
+        return result
 
     # Event handlers
     def handle_arrival(self, now: float) -> None:
@@ -111,8 +262,12 @@ class Strategy2:
         Behandelt ein Ankunftsereignis: Task erzeugen, nächste Ankunft planen.
         :param now: Aktuelle Simulationszeit
         """
-        exp_alpha: float = exp(self.alpha)
-        self.buffer.append(Task(arrival_time=now, exp_alpha=exp_alpha))
+        # Aufgezeichnete Bearbeitungsdauer dieser Ankunft, bevor der nächste Datensatz gelesen wird
+        service_time: Optional[float] = self.trace_service if self.trace_stream is not None else None
+        exp_alpha: float = self.draw_interarrival()
+        task: Task = Task(arrival_time=now, exp_alpha=exp_alpha)
+        task.service_time = service_time
+        self.buffer.append(task)
         self.event_queue.push(Event(now + exp_alpha, Event.ARRIVAL))
 
     def handle_sprint(self, now: float) -> None:
@@ -128,6 +283,8 @@ class Strategy2:
         for task in self.sprint_queue:
             task.sprint = int(now / self.T)
         self.discarded_tasks.extend(discarded)
+        if discarded:
+            self.record_level("discarded", len(self.discarded_tasks))
         self.buffer = []  # Buffer leeren
 
         if not self.server_busy and len(self.sprint_queue) > 0:
@@ -145,7 +302,8 @@ class Strategy2:
         """
         self.server_busy = True
         task.start_time = now
-        service_time: float = exp(self.beta)
+        # Bei trace-getriebenen Läufen ist die Bedienzeit bereits bei der Ankunft bekannt
+        service_time: float = task.service_time if task.service_time is not None else self.draw_service()
         task.service_time = service_time
         # Zeitpunkte als int übergeben
         self.event_queue.push(Event(now + service_time, Event.DEPARTURE, task))
@@ -163,6 +321,9 @@ class Strategy2:
         # Wartezeit berechnen und Statistik aktualisieren
         wait_time: float = task.finish_time - task.arrival_time - task.service_time
         self.total_wait_time += wait_time
+        if wait_time > self.max_wait:
+            self.max_wait = wait_time
+            self.record_level("max_wait", wait_time)
         self.print(
             f"| {task.id: 4d} "
             f"| {task.exp_alpha: 9.4f} "
@@ -0,0 +1,65 @@
+"""
+Modul: Zeitreihen-Aufzeichnung mit konstantem Speicherbedarf
+
+Zustandsgrößen der Simulation (z.B. Schlangenlänge, Buffergröße, Serverstatus) sind stückweise
+konstant und ändern sich nur bei Ereignissen. Statt jedes Ereignis zu speichern, wird der
+Simulationshorizont in eine feste Anzahl gleich breiter Zeitabschnitte (Buckets) geteilt und pro
+Bucket das zeitgewichtete Mittel jeder Größe integriert. Der Speicherbedarf hängt damit nur von der
+Bucket-Anzahl ab, nicht von der Anzahl der Ereignisse. Da alle Replikationen dasselbe Raster nutzen,
+lassen sich die Verläufe direkt zu einem mittleren Pfad mitteln (siehe vector_stats.MeanPath).
+"""
+from typing import Dict, List, Sequence
+
+
+class TimeSeriesRecorder:
+    """
+    Integriert stückweise konstante Signale in ein festes Zeitraster über [0, sim_time].
+    """
+
+    def __init__(self, sim_time: float, signals: Sequence[str], buckets: int = 100) -> None:
+        """
+        :param sim_time: Simulationshorizont
+        :param signals: Namen der aufgezeichneten Größen
+        :param buckets: Anzahl der Zeitabschnitte
+        :raises ValueError: Bei nicht positiver Bucket-Anzahl oder Simulationszeit
+        """
+        if buckets <= 0 or sim_time <= 0:
+            raise ValueError("buckets and sim_time must be positive")
+        self.sim_time: float = sim_time
+        self.signals: List[str] = list(signals)
+        self.buckets: int = buckets
+        self.width: float = sim_time / buckets
+        self.sums: List[List[float]] = [[0.0] * buckets for _ in self.signals]
+        self.last_time: float = 0.0
+
+    def record(self, now: float, values: Sequence[float]) -> None:
+        """
+        Integriert die Werte, die seit dem letzten Aufruf bis now galten.
+        :param now: Aktuelle Simulationszeit
+        :param values: Werte der Signale im Intervall [last_time, now] (Reihenfolge wie signals)
+        """
+        now = min(now, self.sim_time)
+        start: float = self.last_time
+        bucket: int = min(int(start / self.width), self.buckets - 1)
+        while start < now:
+            end: float = now if bucket == self.buckets - 1 else min(now, (bucket + 1) * self.width)
+            if end > start:
+                for sums, value in zip(self.sums, values):
+                    sums[bucket] += value * (end - start)
+                start = end
+            bucket += 1
+        self.last_time = max(self.last_time, now)
+
+    def series(self) -> Dict[str, List[float]]:
+        """
+        Gibt das zeitgewichtete Mittel jedes Signals pro Bucket zurück.
+        :return: Dict Signalname -> Liste der Bucket-Mittelwerte
+        """
+        return {name: [total / self.width for total in sums] for name, sums in zip(self.signals, self.sums)}
+
+    def times(self) -> List[float]:
+        """
+        Gibt die Mittelpunkte der Buckets zurück (x-Werte für Diagramme).
+        :return: Liste der Zeitpunkte
+        """
+        return [(i + 0.5) * self.width for i in range(self.buckets)]
@@ -0,0 +1,189 @@
+"""
+Modul: Trace-Quellen für trace-getriebene Simulation
+
+Statt Zwischenankunfts- und Bedienzeiten aus global_funcs.exp zu ziehen, können die Strategien
+aufgezeichnete Produktionsdaten (Ticket-Ankunftszeitpunkte und Bearbeitungsdauern) abspielen.
+Die Dateien werden blockweise gestreamt, sodass der Speicherbedarf unabhängig von der Tracegröße ist.
+
+Formate:
+- CSV: Eine Zeile pro Task mit Ankunftszeitpunkt und Bearbeitungsdauer (Spalten konfigurierbar).
+  Die Ankunftszeitpunkte müssen aufsteigend sortiert sein.
+- Binär: Aufeinanderfolgende Paare (Zwischenankunftszeit, Bearbeitungsdauer) als float64 in
+  nativer Byte-Reihenfolge. Die Datei wird per mmap eingeblendet und erlaubt wahlfreien Zugriff,
+  daher wird nur hier Bootstrap-Resampling für Replikationen unterstützt. CSV-Traces lassen sich
+  mit csv_to_binary() speicherschonend umwandeln.
+
+Die Trace-Objekte halten nur Pfad und Parameter; stream() öffnet die Datei bei jedem Lauf neu.
+Dadurch bleiben die Strategien für den ScenarioGenerator (copy.deepcopy) kopierbar.
+"""
+import csv
+import itertools
+import mmap
+import random
+from array import array
+from typing import Iterator, Protocol, Tuple
+
+PAIR_SIZE: int = 2 * array("d").itemsize  # Bytes pro Datensatz (Zwischenankunftszeit, Bedienzeit)
+
+
+def _csv_rows(
+    path: str,
+    arrival_column: int,
+    service_column: int,
+    header: bool,
+    time_scale: float,
+    chunk_size: int
+) -> Iterator[Tuple[float, float]]:
+    """
+    Liest eine CSV-Trace blockweise und liefert (Zwischenankunftszeit, Bedienzeit)-Paare.
+    Die erste Ankunft erfolgt zum Zeitpunkt 0, alle Zeiten werden mit time_scale skaliert.
+    """
+    with open(path, newline="") as file:
+        reader = csv.reader(file)
+        if header:
+            next(reader, None)
+        last_arrival: float | None = None
+        while True:
+            chunk = list(itertools.islice(reader, chunk_size))
+            if not chunk:
+                return
+            for row in chunk:
+                arrival: float = float(row[arrival_column])
+                service: float = float(row[service_column])
+                inter_arrival: float = 0.0 if last_arrival is None else arrival - last_arrival
+                if inter_arrival < 0:
+                    raise ValueError(f"Trace {path} is not sorted by arrival time")
+                last_arrival = arrival
+                yield inter_arrival * time_scale, service * time_scale
+
+
+class CsvTrace:
+    """
+    Trace-Quelle für CSV-Dateien mit Ankunftszeitpunkten und Bearbeitungsdauern.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        arrival_column: int = 0,
+        service_column: int = 1,
+        header: bool = True,
+        time_scale: float = 1.0,
+        chunk_size: int = 65536
+    ) -> None:
+        """
+        :param path: Pfad zur CSV-Datei
+        :param arrival_column: Spaltenindex des Ankunftszeitpunkts
+        :param service_column: Spaltenindex der Bearbeitungsdauer
+        :param header: Erste Zeile ist eine Kopfzeile
+        :param time_scale: Faktor zur Umrechnung in Simulationszeiteinheiten
+        :param chunk_size: Anzahl der Zeilen, die pro Block gelesen werden
+        """
+        self.path: str = path
+        self.arrival_column: int = arrival_column
+        self.service_column: int = service_column
+        self.header: bool = header
+        self.time_scale: float = time_scale
+        self.chunk_size: int = chunk_size
+
+    def stream(self) -> Iterator[Tuple[float, float]]:
+        """
+        Liefert die Trace als (Zwischenankunftszeit, Bedienzeit)-Paare in Dateireihenfolge.
+        :return: Iterator über die Paare
+        """
+        return _csv_rows(
+            self.path, self.arrival_column, self.service_column, self.header, self.time_scale, self.chunk_size
+        )
+
+
+class BinaryTrace:
+    """
+    Trace-Quelle für Binärdateien mit (Zwischenankunftszeit, Bedienzeit)-Paaren als float64.
+    Die Datei wird per mmap gelesen; optional wird pro Lauf eine Bootstrap-Stichprobe gezogen.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        bootstrap: bool = False,
+        time_scale: float = 1.0,
+        chunk_size: int = 65536
+    ) -> None:
+        """
+        :param path: Pfad zur Binärdatei
+        :param bootstrap: Pro Lauf mit Zurücklegen aus den Datensätzen ziehen statt abzuspielen
+        :param time_scale: Faktor zur Umrechnung in Simulationszeiteinheiten
+        :param chunk_size: Anzahl der Datensätze, die pro Block gelesen werden
+        """
+        self.path: str = path
+        self.bootstrap: bool = bootstrap
+        self.time_scale: float = time_scale
+        self.chunk_size: int = chunk_size
+
+    def stream(self) -> Iterator[Tuple[float, float]]:
+        """
+        Liefert die Trace als (Zwischenankunftszeit, Bedienzeit)-Paare. Im Bootstrap-Modus werden
+        so viele Datensätze gezogen, wie die Trace enthält.
+        :return: Iterator über die Paare
+        """
+        with open(self.path, "rb") as file:
+            size: int = file.seek(0, 2)
+            if size % PAIR_SIZE != 0:
+                raise ValueError(f"Trace {self.path} has a size that is not a multiple of {PAIR_SIZE} bytes")
+            if size == 0:
+                return
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                values = memoryview(mapped).cast("d")
+                try:
+                    num_rows: int = len(values) // 2
+                    if self.bootstrap:
+                        for _ in range(num_rows):
+                            i: int = random.randrange(num_rows)
+                            yield values[2 * i] * self.time_scale, values[2 * i + 1] * self.time_scale
+                    else:
+                        step: int = 2 * self.chunk_size
+                        for start in range(0, len(values), step):
+                            chunk = values[start:start + step].tolist()
+                            for i in range(0, len(chunk), 2):
+                                yield chunk[i] * self.time_scale, chunk[i + 1] * self.time_scale
+                finally:
+                    values.release()
+
+
+class TraceSource(Protocol):
+    """
+    Schnittstelle, die die Strategien von einer Trace-Quelle erwarten (CsvTrace, BinaryTrace oder
+    z.B. fan_out.SharedArrivalStream).
+    """
+
+    def stream(self) -> Iterator[Tuple[float, float]]:
+        """
+        :return: Iterator über (Zwischenankunftszeit, Bedienzeit)-Paare eines Laufs
+        """
+        ...
+
+
+def csv_to_binary(csv_trace: CsvTrace, binary_path: str) -> int:
+    """
+    Wandelt eine CSV-Trace blockweise in das Binärformat um (z.B. für Bootstrap-Resampling).
+    Die time_scale der CSV-Trace wird dabei bereits angewendet.
+    :param csv_trace: Zu konvertierende CSV-Trace
+    :param binary_path: Pfad der zu schreibenden Binärdatei
+    :return: Anzahl der geschriebenen Datensätze
+    """
+    num_rows: int = 0
+    with open(binary_path, "wb") as file:
+        rows = csv_trace.stream()
+        while True:
+            chunk = array("d", itertools.chain.from_iterable(itertools.islice(rows, csv_trace.chunk_size)))
+            if not chunk:
+                return num_rows
+            chunk.tofile(file)
+            num_rows += len(chunk) // 2
+
+
+# Beispiel für die Nutzung:
+# trace = CsvTrace("tickets.csv", time_scale=1 / 86400)  # Sekunden -> Tage
+# Strategy2(arrival_rate=1.5, service_rate=1.0, simulation_time=240, sprint_length=10, trace=trace).run()
+# csv_to_binary(trace, "tickets.bin")
+# ScenarioGenerator(Strategy1(1.5, 1.0, 240, trace=BinaryTrace("tickets.bin", bootstrap=True))).run(1000)
@@ -0,0 +1,238 @@
+"""
+Modul: Vektorisierte Statistik über viele Kennzahlen und Szenarien
+
+Im Gegensatz zu Stats (eine Liste, eine Kennzahl, feste Normalquantile) werden hier Mittelwert,
+Standardabweichung sowie t- und Normal-Konfidenzintervalle für alle Kennzahlen aller Szenarien
+(z.B. Parameterschar aus Sprintlänge T und Ankunftsrate alpha) in einem Aufruf auf einem Array
+berechnet. Die Replikationen liegen dabei stets auf der letzten Achse.
+
+Für schiefe Kennzahlen wie avg_wait stehen Bootstrap-Perzentilintervalle zur Verfügung. Die
+Resamples werden als Multinomial-Gewichte gezogen, sodass alle Bootstrap-Mittelwerte per
+Matrixmultiplikation entstehen, und blockweise auf mehrere Prozesse verteilt.
+
+Abweichend von Stats wird die Stichproben-Standardabweichung (ddof=1) verwendet.
+"""
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+_BOOTSTRAP_BLOCKS: int = 16  # Feste Blockzahl, unabhängig von der Anzahl der Prozesse
+
+
+def _t_cdf_central(t: float, df: int) -> float:
+    """
+    Gibt P(|T| < t) der t-Verteilung mit ganzzahligen Freiheitsgraden zurück
+    (geschlossene Form nach Abramowitz/Stegun 26.7.3 und 26.7.4).
+    """
+    theta: float = math.atan(abs(t) / math.sqrt(df))
+    cos_sq: float = math.cos(theta) ** 2
+    if df % 2 == 1:
+        term: float = 1.0
+        total: float = 1.0 if df > 1 else 0.0
+        for k in range(3, df - 1, 2):
+            term *= (k - 1) / k * cos_sq
+            total += term
+        return 2.0 / math.pi * (theta + math.sin(theta) * math.cos(theta) * total)
+    term = 1.0
+    total = 1.0
+    for k in range(2, df - 1, 2):
+        term *= (k - 1) / k * cos_sq
+        total += term
+    return math.sin(theta) * total
+
+
+def t_quantile(p: float, df: int) -> float:
+    """
+    Berechnet das p-Quantil der Student-t-Verteilung (0.5 < p < 1).
+    Startwert ist die Cornish-Fisher-Entwicklung um das Normalquantil; für kleine Freiheitsgrade
+    wird mit Newton-Schritten auf der exakten Verteilungsfunktion nachiteriert.
+    :param p: Wahrscheinlichkeit
+    :param df: Freiheitsgrade (>= 1)
+    :return: Quantil
+    """
+    z: float = NormalDist().inv_cdf(p)
+    t: float = (
+        z
+        + (z ** 3 + z) / (4 * df)
+        + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * df ** 2)
+        + (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / (384 * df ** 3)
+        + (79 * z ** 9 + 776 * z ** 7 + 1482 * z ** 5 - 1920 * z ** 3 - 945 * z) / (92160 * df ** 4)
+    )
+    if df > 1000:  # Fehler der Entwicklung vernachlässigbar
+        return t
+    log_norm: float = math.lgamma((df + 1) / 2) - math.lgamma(df / 2) - 0.5 * math.log(df * math.pi)
+    for _ in range(50):
+        density: float = math.exp(log_norm - (df + 1) / 2 * math.log1p(t * t / df))
+        step: float = ((1 + _t_cdf_central(t, df)) / 2 - p) / density
+        t -= step
+        if abs(step) < 1e-12 * t:
+            break
+    return t
+
+
+def from_aggregated(cells: Sequence[Dict[str, List[Any]]], metrics: Sequence[str]) -> np.ndarray:
+    """
+    Stapelt die aggregierten Ergebnisse mehrerer ScenarioGenerator-Läufe zu einem Array.
+    :param cells: Aggregierte Ergebnisse je Szenario (gleiche Anzahl Replikationen)
+    :param metrics: Zu übernehmende Kennzahlen
+    :return: Array der Form (Szenarien, Kennzahlen, Replikationen)
+    """
+    return np.array([[cell[metric] for metric in metrics] for cell in cells], dtype=float)
+
+
+def summarize(data: np.ndarray, confidence: float = 0.95) -> Dict[str, np.ndarray]:
+    """
+    Berechnet Mittelwert, Standardabweichung sowie t- und Normal-Konfidenzintervalle für alle Zeilen.
+    :param data: Array mit den Replikationen auf der letzten Achse (mindestens 2 Replikationen)
+    :param confidence: Konfidenzniveau
+    :return: Dict mit "mean", "std", "t_lower", "t_upper", "normal_lower", "normal_upper"
+    :raises ValueError: Bei weniger als zwei Replikationen
+    """
+    data = np.asarray(data, dtype=float)
+    n: int = data.shape[-1]
+    if n < 2:
+        raise ValueError("at least two replications are required")
+
+    mean: np.ndarray = data.mean(axis=-1)
+    std: np.ndarray = data.std(axis=-1, ddof=1)
+    std_err: np.ndarray = std / math.sqrt(n)
+    p: float = 0.5 + confidence / 2
+    t_span: np.ndarray = t_quantile(p, n - 1) * std_err
+    normal_span: np.ndarray = NormalDist().inv_cdf(p) * std_err
+    return {
+        "mean": mean,
+        "std": std,
+        "t_lower": mean - t_span,
+        "t_upper": mean + t_span,
+        "normal_lower": mean - normal_span,
+        "normal_upper": mean + normal_span
+    }
+
+
+def likelihood_ratio_gradient(
+    values: Sequence[float],
+    scores: Sequence[float],
+    confidence: float = 0.95
+) -> Tuple[float, float, float]:
+    """
+    Schätzt d E[values] / d(theta) per Likelihood-Ratio-Methode als Cov(values, score) über die
+    Replikationen. Die Produkte (values - Mittelwert) * score sind zentriert und haben damit eine um
+    Größenordnungen kleinere Varianz als values * score; der Faktor n / (n - 1) macht die
+    Kovarianzschätzung erwartungstreu.
+    :param values: Kennzahl je Replikation, z.B. avg_wait
+    :param scores: Score-Funktion je Replikation, z.B. score_alpha
+    :param confidence: Konfidenzniveau
+    :return: Schätzwert, untere und obere Grenze des t-Konfidenzintervalls
+    :raises ValueError: Bei weniger als zwei Replikationen
+    """
+    x: np.ndarray = np.asarray(values, dtype=float)
+    score: np.ndarray = np.asarray(scores, dtype=float)
+    n: int = len(x)
+    if n < 2:
+        raise ValueError("at least two replications are required")
+    products: np.ndarray = (x - x.mean()) * score * n / (n - 1)
+    summary: Dict[str, np.ndarray] = summarize(products, confidence)
+    return float(summary["mean"]), float(summary["t_lower"]), float(summary["t_upper"])
+
+
+def _bootstrap_means(data: np.ndarray, resamples: int, seed: np.random.SeedSequence) -> np.ndarray:
+    """
+    Zieht Bootstrap-Mittelwerte für alle Zeilen von data (2-D, Replikationen auf Achse 1).
+    Alle Zeilen teilen sich dieselben Resamples, die als Multinomial-Gewichte gezogen werden.
+    :return: Array der Form (Zeilen, resamples)
+    """
+    rng: np.random.Generator = np.random.default_rng(seed)
+    n: int = data.shape[1]
+    means: np.ndarray = np.empty((data.shape[0], resamples))
+    block: int = max(1, 2 ** 22 // n)  # Gewichtsmatrix auf ca. 32 MB begrenzen
+    for start in range(0, resamples, block):
+        size: int = min(block, resamples - start)
+        weights: np.ndarray = rng.multinomial(n, np.full(n, 1.0 / n), size=size)
+        means[:, start:start + size] = data @ weights.T / n
+    return means
+
+
+def bootstrap_ci(
+    data: np.ndarray,
+    confidence: float = 0.95,
+    resamples: int = 2000,
+    workers: Optional[int] = None,
+    seed: Optional[int] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Berechnet Bootstrap-Perzentilintervalle für den Mittelwert aller Zeilen.
+    Die Resamples werden in eine feste Anzahl Blöcke mit eigenem Startwert aufgeteilt, die Prozesse
+    bearbeiten nur ganze Blöcke. Bei gegebenem seed hängt das Ergebnis daher nicht von workers ab.
+    :param data: Array mit den Replikationen auf der letzten Achse
+    :param confidence: Konfidenzniveau
+    :param resamples: Anzahl der Bootstrap-Resamples
+    :param workers: Anzahl der Prozesse (None: alle Kerne, 1: ohne Prozesspool)
+    :param seed: Optionaler Startwert für reproduzierbare Intervalle
+    :return: Untere und obere Grenzen in der Form von data ohne letzte Achse
+    """
+    data = np.asarray(data, dtype=float)
+    rows: np.ndarray = data.reshape(-1, data.shape[-1])
+    num_blocks: int = max(1, min(_BOOTSTRAP_BLOCKS, resamples))
+    block_sizes: List[int] = [len(block) for block in np.array_split(np.arange(resamples), num_blocks)]
+    seeds: List[np.random.SeedSequence] = np.random.SeedSequence(seed).spawn(num_blocks)
+    num_workers: int = min(num_blocks, workers if workers is not None else (os.cpu_count() or 1))
+
+    if num_workers == 1:
+        parts = map(_bootstrap_means, [rows] * num_blocks, block_sizes, seeds)
+        means: np.ndarray = np.concatenate(list(parts), axis=1)
+    else:
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            parts = executor.map(_bootstrap_means, [rows] * num_blocks, block_sizes, seeds)
+            means = np.concatenate(list(parts), axis=1)
+
+    alpha: float = (1 - confidence) / 2
+    lower, upper = np.quantile(means, [alpha, 1 - alpha], axis=1)
+    return lower.reshape(data.shape[:-1]), upper.reshape(data.shape[:-1])
+
+
+class MeanPath:
+    """
+    Mittelt Zeitreihen (gleiches Bucket-Raster) über Replikationen zu einem mittleren Pfad mit Band.
+    Mittelwert und Streuung werden laufend aktualisiert (Welford), der Speicherbedarf ist daher
+    unabhängig von der Anzahl der Replikationen.
+    """
+
+    def __init__(self) -> None:
+        self.count: int = 0
+        self.mean: Dict[str, np.ndarray] = {}
+        self.m2: Dict[str, np.ndarray] = {}  # Summe der quadrierten Abweichungen
+
+    def add(self, series: Dict[str, List[float]]) -> None:
+        """
+        Nimmt die Zeitreihen einer Replikation auf.
+        :param series: Dict Signalname -> Bucket-Mittelwerte (z.B. TimeSeriesRecorder.series())
+        """
+        self.count += 1
+        for name, values in series.items():
+            x: np.ndarray = np.asarray(values, dtype=float)
+            if name not in self.mean:
+                self.mean[name] = np.zeros_like(x)
+                self.m2[name] = np.zeros_like(x)
+            delta: np.ndarray = x - self.mean[name]
+            self.mean[name] += delta / self.count
+            self.m2[name] += delta * (x - self.mean[name])
+
+    def band(self, confidence: float = 0.95) -> Dict[str, Dict[str, np.ndarray]]:
+        """
+        Berechnet den mittleren Pfad mit t-Konfidenzband je Bucket.
+        :param confidence: Konfidenzniveau
+        :return: Dict Signalname -> {"mean", "lower", "upper"}
+        :raises ValueError: Bei weniger als zwei Replikationen
+        """
+        if self.count < 2:
+            raise ValueError("at least two replications are required")
+        quantile: float = t_quantile(0.5 + confidence / 2, self.count - 1)
+        result: Dict[str, Dict[str, np.ndarray]] = {}
+        for name, mean in self.mean.items():
+            span: np.ndarray = quantile * np.sqrt(self.m2[name] / (self.count - 1) / self.count)
+            result[name] = {"mean": mean, "lower": mean - span, "upper": mean + span}
+        return result